@@ -3,13 +3,168 @@ Gmail Poller
 Continuously monitors Gmail inbox for new emails
 """
 
-import base64
+import functools
+import logging
+import random
+import socket
+import sqlite3
+import threading
 import time
-from email.parser import BytesParser
-from email.policy import default
-from typing import Callable, Optional, List, Dict
+from collections import OrderedDict
+from typing import Callable, Optional, Iterator, List, Dict, Tuple
 import re
 
+from googleapiclient.errors import HttpError
+
+log = logging.getLogger(__name__)
+
+# SIMD-accelerated base64 when available
+try:
+    from pybase64 import urlsafe_b64decode
+except ImportError:
+    from base64 import urlsafe_b64decode
+
+# C-backed HTML parser when available, regex stripping otherwise
+# (the Lexbor backend; selectolax 1.0 dropped the Modest HTMLParser)
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    HTMLParser = None
+
+# Gmail accepts at most 100 sub-requests per batch call
+BATCH_LIMIT = 100
+
+# Messages fetched per round trip; caps how many bodies are held in memory
+MAX_FETCH_BATCH = 10
+
+# Ids per page when listing unread mail (Gmail's maximum)
+LIST_PAGE_SIZE = 500
+
+# Unread emails taken per full scan, so a large inbox is backfilled over
+# several polls instead of starting hundreds of workflows at once
+MAX_BACKFILL = 50
+
+# Processed ids cached in-process in front of the poll_state table
+MAX_PROCESSED_IDS = 10_000
+
+# Gmail push watches expire after 7 days; renew daily as Google recommends
+WATCH_RENEW_INTERVAL = 24 * 60 * 60
+
+# Compiled once at import, reused for every parsed message
+_FROM_RE = re.compile(r'<(.+?)>')
+_HTML_TAG_RE = re.compile(r'<[^<]+?>')
+_SCRIPT_STYLE_RE = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+
+
+def _html_to_text(html: str) -> str:
+    """Extract readable text from an HTML email body."""
+    if HTMLParser is None:
+        # Drop script/style blocks whole, then the remaining tags
+        return _HTML_TAG_RE.sub('', _SCRIPT_STYLE_RE.sub('', html))
+    
+    tree = HTMLParser(html)
+    # Don't hand script/style contents to the LLM
+    tree.strip_tags(['script', 'style'])
+    root = tree.body or tree.root
+    return root.text(separator=' ', strip=True) if root else ''
+
+
+def _is_retriable(error: Exception) -> bool:
+    """Rate limits, server errors and timeouts are transient; auth errors are not."""
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        return status == 429 or status >= 500
+    return isinstance(error, (socket.timeout, ConnectionError))
+
+
+def retry(max_retries: int = 3, base: float = 1.0, cap: float = 30.0, jitter: float = 0.5):
+    """
+    Retry a Gmail API call with exponential backoff and jitter.
+    
+    Only transient errors (429, 5xx, timeouts) are retried; anything else,
+    e.g. 401/403, is raised immediately.
+    
+    Args:
+        max_retries: Retries after the first attempt
+        base: Delay in seconds before the first retry
+        cap: Maximum delay in seconds before jitter
+        jitter: Random extra fraction added to each delay
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(max_retries + 1):
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    if attempt == max_retries or not _is_retriable(e):
+                        raise
+                    delay = min(cap, base * 2 ** attempt) * (1 + random.uniform(0, jitter))
+                    log.warning("⏳ Gmail API error (%s), retrying in %.1fs...", e, delay)
+                    time.sleep(delay)
+        return wrapper
+    return decorator
+
+
+class PollState:
+    """
+    Poller bookkeeping persisted in the agent's SQLite database.
+    
+    Stores processed message ids and the Gmail historyId so a restart
+    neither re-processes already handled mail nor rescans the inbox.
+    """
+    
+    def __init__(self, db_path: str = "agent_memory.db"):
+        # Autocommit: each write is its own small transaction
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS poll_state (
+                email_id TEXT PRIMARY KEY,
+                processed_at INTEGER
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS kv (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+    
+    def get_history_id(self) -> Optional[str]:
+        """Last Gmail historyId seen, if any."""
+        row = self.conn.execute("SELECT value FROM kv WHERE key = 'history_id'").fetchone()
+        return row[0] if row else None
+    
+    def set_history_id(self, history_id: str):
+        """Remember the Gmail historyId to resume delta polling from."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO kv (key, value) VALUES ('history_id', ?)",
+            (history_id,)
+        )
+    
+    def is_processed(self, email_id: str) -> bool:
+        """Whether a message was already handed to the agent."""
+        return self.conn.execute(
+            "SELECT 1 FROM poll_state WHERE email_id = ?", (email_id,)
+        ).fetchone() is not None
+    
+    def mark_processed(self, email_ids: List[str]):
+        """Record messages as processed in one transaction."""
+        now = int(time.time())
+        # Autocommit mode never opens a transaction on its own
+        self.conn.execute("BEGIN")
+        try:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO poll_state VALUES (?, ?)",
+                [(email_id, now) for email_id in email_ids]
+            )
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
 
 class GmailPoller:
     """
@@ -17,69 +172,233 @@ class GmailPoller:
     Processes each email through a callback function.
     """
     
-    def __init__(self, gmail_service, poll_interval: int = 60):
+    def __init__(
+        self,
+        gmail_service,
+        poll_interval: int = 60,
+        db_path: str = "agent_memory.db"
+    ):
         """
         Initialize Gmail poller.
         
         Args:
             gmail_service: Authenticated Gmail API service
             poll_interval: Seconds between checks (default: 60)
+            db_path: SQLite database where poll state is persisted
         """
         self.gmail = gmail_service
+        
+        # Resolve discovery resources once; the polling hot path reuses them
+        users = gmail_service.users()
+        messages = users.messages()
+        self._get_profile = users.getProfile
+        self._watch = users.watch
+        self._history_list = users.history().list
+        self._messages_list = messages.list
+        self._messages_get = messages.get
+        self._messages_modify = messages.modify
         self.poll_interval = poll_interval
-        self.processed_ids = set()
+        self.state = PollState(db_path)
+        self.history_id = self.state.get_history_id()
+        self.processed_ids: OrderedDict = OrderedDict()
+        self._fetched: List[Dict] = []
+        self._poll_lock = threading.Lock()
+        self.consecutive_errors = 0
         self.running = False
     
-    def fetch_unread_emails(self) -> List[Dict]:
+    def _save_history_id(self, history_id: str):
+        """Remember the Gmail historyId so restarts only see new mail."""
+        self.history_id = history_id
+        try:
+            self.state.set_history_id(history_id)
+        except sqlite3.Error as e:
+            log.warning("⚠️  Could not save poller state: %s", e)
+    
+    def _remember(self, msg_id: str):
+        """Record a processed message id, evicting the oldest past the cap."""
+        self.processed_ids[msg_id] = None
+        if len(self.processed_ids) > MAX_PROCESSED_IDS:
+            self.processed_ids.popitem(last=False)
+    
+    def fetch_unread_emails(self) -> Iterator[Dict]:
         """
-        Fetch unread emails from Gmail inbox.
+        Fetch new unread emails from Gmail inbox.
         
-        Returns:
-            List of email dicts with id, from, to, subject, body
+        Uses the Gmail history API to receive only messages added since
+        the last poll. Falls back to a full unread scan on first run or
+        when the stored historyId has expired; that scan takes at most
+        MAX_BACKFILL emails per poll and keeps scanning on later polls
+        until the backlog is drained.
+        
+        Emails are fetched MAX_FETCH_BATCH at a time and yielded one by
+        one, so only a small batch of message bodies is in memory at once.
+        
+        The stored historyId only advances once every listed message has
+        been handed off (recorded via _remember by poll_once). If a fetch
+        or callback fails, the old cursor is kept and the next poll lists
+        the same range again; already handled ids are filtered out.
+        
+        Yields:
+            Email dicts with id, from, to, subject, body
         """
         try:
-            # Query Gmail for unread emails in inbox
-            results = self.gmail.users().messages().list(
+            new_ids, history_id = None, None
+            if self.history_id:
+                try:
+                    new_ids, history_id = self._list_history()
+                except HttpError as e:
+                    # 404 means startHistoryId is too old - resync below
+                    if e.resp.status != 404:
+                        raise
+            
+            if new_ids is None:
+                new_ids, history_id = self._list_unread()
+            
+            # Skip messages already processed (this session or before a restart)
+            new_ids = [msg_id for msg_id in new_ids if not self._is_handled(msg_id)]
+            
+            for start in range(0, len(new_ids), MAX_FETCH_BATCH):
+                emails = self._fetch_messages(new_ids[start:start + MAX_FETCH_BATCH])
+                while emails:
+                    yield emails.pop(0)
+            
+            if history_id is None:
+                # Partial backfill - scan again next poll rather than
+                # jumping the cursor past the rest of the backlog
+                log.info("📥 Backfilled %d email(s), more on next poll", len(new_ids))
+            elif all(msg_id in self.processed_ids for msg_id in new_ids):
+                self._save_history_id(history_id)
+            else:
+                log.warning("⚠️  Some emails were not handled, will retry on next poll")
+            
+        except Exception as e:
+            log.error("❌ Error fetching emails: %s", e)
+    
+    def _is_handled(self, msg_id: str) -> bool:
+        """Whether a message was handled this session or before a restart."""
+        return msg_id in self.processed_ids or self.state.is_processed(msg_id)
+    
+    @retry()
+    def _list_unread(self) -> Tuple[List[str], Optional[str]]:
+        """
+        Full scan of unread inbox messages, up to MAX_BACKFILL new ones.
+        
+        Returns:
+            (message ids, current historyId to resume delta polling from,
+            or None if more unread mail is left for the next scan)
+        """
+        # Read the profile first so nothing arriving mid-scan is missed
+        history_id = self._get_profile(userId='me').execute()['historyId']
+        
+        message_ids = []
+        page_token = None
+        
+        # Skip handled ids while paging so they don't use up the cap
+        while True:
+            results = self._messages_list(
                 userId='me',
                 q='is:unread in:inbox',
-                maxResults=10
+                labelIds=['UNREAD', 'INBOX'],
+                maxResults=LIST_PAGE_SIZE,
+                pageToken=page_token
             ).execute()
             
-            messages = results.get('messages', [])
+            for msg in results.get('messages', []):
+                if self._is_handled(msg['id']):
+                    continue
+                if len(message_ids) == MAX_BACKFILL:
+                    return message_ids, None
+                message_ids.append(msg['id'])
             
-            if not messages:
-                return []
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return message_ids, history_id
+    
+    @retry()
+    def _list_history(self) -> Tuple[List[str], str]:
+        """
+        List unread inbox messages added since the stored historyId.
+        
+        Returns:
+            (message ids, latest historyId)
+        """
+        message_ids = []
+        page_token = None
+        
+        while True:
+            response = self._history_list(
+                userId='me',
+                startHistoryId=self.history_id,
+                historyTypes=['messageAdded'],
+                labelId='INBOX',
+                pageToken=page_token
+            ).execute()
             
-            emails = []
-            for msg in messages:
-                # Skip if already processed this session
-                if msg['id'] in self.processed_ids:
-                    continue
-                
-                # Get full message
-                try:
-                    full_msg = self.gmail.users().messages().get(
-                        userId='me',
-                        id=msg['id'],
-                        format='raw'
-                    ).execute()
-                    
-                    # Parse email
-                    email_data = self._parse_message(full_msg)
-                    
-                    if email_data:
-                        emails.append(email_data)
-                        self.processed_ids.add(msg['id'])
-                        
-                except Exception as e:
-                    print(f"   ❌ Error fetching message {msg['id']}: {e}")
-                    continue
+            for record in response.get('history', []):
+                for added in record.get('messagesAdded', []):
+                    msg = added['message']
+                    if 'UNREAD' in msg.get('labelIds', []) and msg['id'] not in message_ids:
+                        message_ids.append(msg['id'])
             
-            return emails
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return message_ids, response['historyId']
+    
+    def _fetch_messages(self, message_ids: List[str]) -> List[Dict]:
+        """
+        Fetch and parse full messages using Gmail batch requests.
+        
+        All gets are sent in a single HTTP round trip per chunk of
+        BATCH_LIMIT ids instead of one request per message.
+        
+        Args:
+            message_ids: Gmail message IDs to fetch
             
-        except Exception as e:
-            print(f"❌ Error fetching emails: {e}")
-            return []
+        Returns:
+            List of parsed email dicts (failed fetches are skipped)
+        """
+        self._fetched = []
+        
+        for start in range(0, len(message_ids), BATCH_LIMIT):
+            batch = self.gmail.new_batch_http_request(callback=self._on_fetched)
+            for msg_id in message_ids[start:start + BATCH_LIMIT]:
+                batch.add(
+                    self._messages_get(
+                        userId='me',
+                        id=msg_id,
+                        format='full'
+                    ),
+                    request_id=msg_id
+                )
+            self._execute_batch(batch)
+        
+        emails, self._fetched = self._fetched, []
+        return emails
+    
+    @retry()
+    def _execute_batch(self, batch):
+        """Send a batch request; failures of single messages go to the callback."""
+        batch.execute()
+    
+    def _on_fetched(self, request_id: str, response: dict, exception):
+        """Batch callback: parse each fetched message as it arrives."""
+        if exception is not None:
+            log.error("❌ Error fetching message %s: %s", request_id, exception)
+            if not _is_retriable(exception):
+                # e.g. 404 for mail deleted since it was listed - a retry
+                # can't succeed, so don't hold the cursor for it
+                self._remember(request_id)
+            # Transient errors aren't handed off; the poll keeps its cursor
+            return
+        
+        # Parse email
+        email_data = self._parse_message(response)
+        
+        if email_data:
+            self._fetched.append(email_data)
+        else:
+            # Unparseable mail won't get better on retry; don't hold the cursor
+            self._remember(request_id)
     
     def _parse_message(self, message: dict) -> Optional[Dict]:
         """
@@ -92,49 +411,42 @@ class GmailPoller:
             Dict with email fields or None if parsing fails
         """
         try:
-            # Decode base64 raw message
-            raw = base64.urlsafe_b64decode(message['raw'])
-            
-            # Parse with email library
-            parsed = BytesParser(policy=default).parsebytes(raw)
+            payload = message.get('payload', {})
             
-            # Extract headers
-            email_from = parsed.get('From', '')
-            email_to = parsed.get('To', '')
-            subject = parsed.get('Subject', '')
+            # Headers arrive pre-parsed; normalise names for lookup
+            headers = {
+                h['name'].lower(): h['value']
+                for h in payload.get('headers', [])
+            }
+            email_from = headers.get('from', '')
+            email_to = headers.get('to', '')
+            subject = headers.get('subject', '')
             
             # Clean up from field (extract just email if has name)
             # "John Doe <john@example.com>" → "john@example.com"
-            from_match = re.search(r'<(.+?)>', email_from)
+            from_match = _FROM_RE.search(email_from)
             if from_match:
                 email_from_clean = from_match.group(1)
             else:
                 email_from_clean = email_from.strip()
             
-            # Extract body (prefer plain text)
+            # Extract body (prefer plain text, fallback to HTML)
             body = ""
-            if parsed.is_multipart():
-                for part in parsed.walk():
-                    content_type = part.get_content_type()
-                    if content_type == 'text/plain':
-                        try:
-                            body = part.get_content()
-                            break
-                        except:
-                            pass
-                    elif content_type == 'text/html' and not body:
-                        # Fallback to HTML if no plain text
-                        try:
-                            html_body = part.get_content()
-                            # Basic HTML stripping
-                            body = re.sub('<[^<]+?>', '', html_body)
-                        except:
-                            pass
+            if not payload.get('parts'):
+                # Fast path: single-part message, nothing to walk
+                mime_type = payload.get('mimeType')
+                if mime_type == 'text/plain' and payload.get('body', {}).get('data'):
+                    body = self._decode_part(payload)
+                elif mime_type == 'text/html' and payload.get('body', {}).get('data'):
+                    body = _html_to_text(self._decode_part(payload))
             else:
-                try:
-                    body = parsed.get_content()
-                except:
-                    body = "Could not extract email body"
+                part = self._find_part(payload, 'text/plain')
+                if part:
+                    body = self._decode_part(part)
+                else:
+                    part = self._find_part(payload, 'text/html')
+                    if part:
+                        body = _html_to_text(self._decode_part(part))
             
             # Clean up body
             body = body.strip()
@@ -151,9 +463,42 @@ class GmailPoller:
             }
             
         except Exception as e:
-            print(f"❌ Error parsing message {message.get('id')}: {e}")
+            log.error("❌ Error parsing message %s: %s", message.get('id'), e)
             return None
     
+    def _find_part(self, part: dict, mime_type: str) -> Optional[dict]:
+        """
+        Depth-first search for the first message part of a MIME type.
+        
+        Args:
+            part: Gmail message payload or sub-part
+            mime_type: e.g. 'text/plain'
+            
+        Returns:
+            The matching part, or None
+        """
+        if part.get('mimeType') == mime_type and part.get('body', {}).get('data'):
+            return part
+        for sub_part in part.get('parts', []):
+            found = self._find_part(sub_part, mime_type)
+            if found:
+                return found
+        return None
+    
+    def _decode_part(self, part: dict) -> str:
+        """Decode the base64url body of a single message part."""
+        data = urlsafe_b64decode(part['body']['data'])
+        return data.decode('utf-8', errors='replace')
+    
+    @retry()
+    def _modify(self, email_id: str, body: dict):
+        """Apply a label change to a message."""
+        self._messages_modify(
+            userId='me',
+            id=email_id,
+            body=body
+        ).execute()
+    
     def mark_as_read(self, email_id: str):
         """
         Mark email as read in Gmail.
@@ -162,14 +507,10 @@ class GmailPoller:
             email_id: Gmail message ID
         """
         try:
-            self.gmail.users().messages().modify(
-                userId='me',
-                id=email_id,
-                body={'removeLabelIds': ['UNREAD']}
-            ).execute()
-            print(f"   ✅ Marked as read")
+            self._modify(email_id, {'removeLabelIds': ['UNREAD']})
+            log.info("✅ Marked %s as read", email_id)
         except Exception as e:
-            print(f"   ⚠️  Could not mark as read: {e}")
+            log.warning("⚠️  Could not mark as read: %s", e)
     
     def add_label(self, email_id: str, label: str):
         """
@@ -180,92 +521,209 @@ class GmailPoller:
             label: Label to add (e.g., 'PROCESSED')
         """
         try:
-            self.gmail.users().messages().modify(
-                userId='me',
-                id=email_id,
-                body={'addLabelIds': [label]}
-            ).execute()
+            self._modify(email_id, {'addLabelIds': [label]})
         except Exception as e:
-            print(f"   ⚠️  Could not add label: {e}")
+            log.warning("⚠️  Could not add label: %s", e)
+    
+    def mark_and_label(self, email_id: str, add=None, remove=('UNREAD',)):
+        """
+        Change labels with a single modify call (marks as read by default).
+        
+        Args:
+            email_id: Gmail message ID
+            add: Labels to add
+            remove: Labels to remove
+        """
+        try:
+            self._modify(email_id, self._label_body(add, remove))
+        except Exception as e:
+            log.warning("⚠️  Could not update labels: %s", e)
+    
+    def _label_body(self, add, remove) -> dict:
+        """Build a messages().modify body."""
+        return {'addLabelIds': list(add or []), 'removeLabelIds': list(remove or [])}
+    
+    def modify_batch(self, changes: List[Tuple[str, Optional[List[str]], Tuple[str, ...]]]):
+        """
+        Apply label changes for several messages in one batch request.
+        
+        Args:
+            changes: (email_id, add, remove) tuples as for mark_and_label
+        """
+        def on_modified(request_id, response, exception):
+            if exception is not None:
+                log.warning("⚠️  Could not update labels for %s: %s", request_id, exception)
+        
+        for start in range(0, len(changes), BATCH_LIMIT):
+            batch = self.gmail.new_batch_http_request(callback=on_modified)
+            for email_id, add, remove in changes[start:start + BATCH_LIMIT]:
+                batch.add(
+                    self._messages_modify(
+                        userId='me',
+                        id=email_id,
+                        body=self._label_body(add, remove)
+                    ),
+                    request_id=email_id
+                )
+            try:
+                self._execute_batch(batch)
+            except Exception as e:
+                log.warning("⚠️  Could not update labels: %s", e)
+    
+    @retry()
+    def watch(self, topic_name: str) -> Dict:
+        """
+        Ask Gmail to push INBOX changes to a Cloud Pub/Sub topic.
+        
+        A watch expires after 7 days; Gmail recommends renewing daily.
+        
+        Args:
+            topic_name: Full topic name, e.g. 'projects/my-proj/topics/gmail'
+            
+        Returns:
+            Gmail watch response with historyId and expiration
+        """
+        response = self._watch(
+            userId='me',
+            body={'topicName': topic_name, 'labelIds': ['INBOX']}
+        ).execute()
+        log.info("✅ Gmail push watch active (history %s)", response.get('historyId'))
+        return response
+    
+    def poll_once(self, callback: Callable[[Dict], None]) -> int:
+        """
+        Fetch new emails once and run the callback for each.
+        
+        Called by the polling loop and by the Gmail push endpoint, so
+        concurrent calls are serialized.
+        
+        Args:
+            callback: Function to call for each email.
+            
+        Returns:
+            Number of new emails found
+        """
+        with self._poll_lock:
+            found = 0
+            processed = []
+            
+            # Emails are fetched lazily, a small batch at a time
+            for email in self.fetch_unread_emails():
+                found += 1
+                log.info(
+                    "📧 New Email #%d: from=%s subject=%r id=%s",
+                    found, email['from_full'], email['subject'], email['id']
+                )
+                
+                try:
+                    # Call the callback function (triggers agent workflow)
+                    callback(email)
+                    self._remember(email['id'])
+                    
+                    # Mark as read after successful processing
+                    processed.append((email['id'], None, ('UNREAD',)))
+                    
+                    # Reset error counter on success
+                    self.consecutive_errors = 0
+                    
+                except Exception as e:
+                    log.exception("❌ Error in callback: %s", e)
+                    self.consecutive_errors += 1
+            
+            # One batched modify for the whole poll
+            if processed:
+                self.modify_batch(processed)
+                log.info("✅ Marked %d email(s) as read", len(processed))
+                try:
+                    self.state.mark_processed([email_id for email_id, _, _ in processed])
+                except sqlite3.Error as e:
+                    log.warning("⚠️  Could not save poller state: %s", e)
+            
+            return found
     
     def start_polling(self, callback: Callable[[Dict], None]):
         """
         Start continuous polling loop.
         
+        The callback should only schedule work (run_server hands each email
+        to the background event loop), so agent runs overlap with the
+        next poll instead of delaying it.
+        
         Args:
             callback: Function to call for each email.
                      Should accept email_data dict as argument.
         """
         self.running = True
         
-        print(f"\n{'='*70}")
-        print(f"📧 GMAIL POLLER STARTED")
-        print(f"{'='*70}")
-        print(f"⏰ Checking every {self.poll_interval} seconds")
-        print(f"📬 Monitoring inbox for unread emails")
-        print(f"Press Ctrl+C to stop")
-        print(f"{'='*70}\n")
+        log.info("📧 GMAIL POLLER STARTED - checking every %d seconds", self.poll_interval)
         
-        consecutive_errors = 0
+        self.consecutive_errors = 0
         max_errors = 5
         
         while self.running:
             try:
-                # Fetch new emails
-                emails = self.fetch_unread_emails()
+                poll_started = time.monotonic()
                 
-                if emails:
-                    print(f"\n📬 Found {len(emails)} new email(s)")
-                    
-                    for email in emails:
-                        print(f"\n{'─'*70}")
-                        print(f"📧 New Email:")
-                        print(f"   From: {email['from_full']}")
-                        print(f"   Subject: {email['subject']}")
-                        print(f"   ID: {email['id']}")
-                        print(f"{'─'*70}")
-                        
-                        try:
-                            # Call the callback function (triggers agent workflow)
-                            callback(email)
-                            
-                            # Mark as read after successful processing
-                            self.mark_as_read(email['id'])
-                            
-                            # Reset error counter on success
-                            consecutive_errors = 0
-                            
-                        except Exception as e:
-                            print(f"   ❌ Error in callback: {e}")
-                            import traceback
-                            traceback.print_exc()
-                            consecutive_errors += 1
-                else:
-                    # No new emails - just print timestamp occasionally
-                    current_time = time.strftime("%H:%M:%S")
-                    print(f"[{current_time}] ✓ No new emails", end='\r')
+                if not self.poll_once(callback):
+                    log.debug("✓ No new emails")
                 
                 # Check if too many consecutive errors
-                if consecutive_errors >= max_errors:
-                    print(f"\n❌ Too many consecutive errors ({consecutive_errors})")
-                    print(f"   Pausing for 5 minutes...")
+                if self.consecutive_errors >= max_errors:
+                    log.error(
+                        "❌ Too many consecutive errors (%d), pausing for 5 minutes...",
+                        self.consecutive_errors
+                    )
                     time.sleep(300)  # Wait 5 minutes
-                    consecutive_errors = 0
+                    self.consecutive_errors = 0
+                
+                # Wait before next check, measured from the start of this
+                # poll so slow fetches don't stretch the interval
+                elapsed = time.monotonic() - poll_started
+                time.sleep(max(0.0, self.poll_interval - elapsed))
                 
-                # Wait before next check
+            except KeyboardInterrupt:
+                log.info("👋 Stopping poller...")
+                self.running = False
+                break
+                
+            except Exception as e:
+                log.error("❌ Poller error: %s", e)
+                self.consecutive_errors += 1
                 time.sleep(self.poll_interval)
+    
+    def keep_watch_alive(self, topic_name: str):
+        """
+        Renew the Gmail push watch until stopped.
+        
+        Used instead of start_polling when push notifications are enabled;
+        new mail is handled by the push endpoint calling poll_once.
+        
+        Args:
+            topic_name: Pub/Sub topic passed to watch()
+        """
+        self.running = True
+        
+        log.info(
+            "📧 GMAIL PUSH NOTIFICATIONS ENABLED - topic %s, renewing every %d hours",
+            topic_name, WATCH_RENEW_INTERVAL // 3600
+        )
+        
+        while self.running:
+            try:
+                time.sleep(WATCH_RENEW_INTERVAL)
+                self.watch(topic_name)
                 
             except KeyboardInterrupt:
-                print("\n\n👋 Stopping poller...")
+                log.info("👋 Stopping poller...")
                 self.running = False
                 break
                 
             except Exception as e:
-                print(f"\n❌ Poller error: {e}")
-                consecutive_errors += 1
+                # Retry sooner so the watch doesn't lapse
+                log.error("❌ Could not renew Gmail watch: %s", e)
                 time.sleep(self.poll_interval)
     
     def stop(self):
         """Stop the polling loop."""
         self.running = False
-        print("📧 Poller stopped")
\ No newline at end of file
+        log.info("📧 Poller stopped")
\ No newline at end of file
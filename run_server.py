@@ -5,9 +5,13 @@ FIXED: Concurrent email processing - no more queue blocking!
 """
 
 import asyncio
+import functools
+import importlib.util
+import logging
 import threading
 import time
 import webbrowser
+import weakref
 
 # Gmail integration
 from src.integrations.gmail_auth import authenticate_google_services
@@ -20,20 +24,43 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from ui.app import app, run_agent_workflow
+from ui import app as ui_module
+from src.agents.email_graph import create_email_agent
 
 # Import Gmail poller
 from gmail_poller import GmailPoller
 
+# Agent workflows run on uvloop when it is installed
+try:
+    from uvloop import new_event_loop
+except ImportError:
+    from asyncio import new_event_loop
+
+# Max concurrent HTTP requests + websockets served by the UI
+UI_LIMIT_CONCURRENCY = 100
+
 # Global reference to the background asyncio loop
 background_loop = None
+loop_ready = threading.Event()
 
 def run_background_loop():
     """Create and run the background event loop."""
     global background_loop
-    background_loop = asyncio.new_event_loop()
+    background_loop = new_event_loop()
     asyncio.set_event_loop(background_loop)
+    loop_ready.set()
     background_loop.run_forever()
 
+# In-flight workflow futures, for introspection
+workflow_futures = weakref.WeakSet()
+
+def _log_result(workflow_id: str, future):
+    """Report workflows that died with an unhandled exception."""
+    if future.cancelled():
+        print(f"⚠️  Workflow {workflow_id} was cancelled")
+    elif future.exception() is not None:
+        print(f"❌ Workflow {workflow_id} failed: {future.exception()}")
+
 def process_incoming_email(email_data: dict):
     """
     Callback function for each incoming Gmail email.
@@ -66,13 +93,15 @@ def process_incoming_email(email_data: dict):
     
     # ✅ FIX: Create a task instead of using a queue
     # This allows multiple emails to be processed concurrently
-    asyncio.run_coroutine_threadsafe(
+    future = asyncio.run_coroutine_threadsafe(
         run_agent_workflow(
             workflow_id=agent_input['workflow_id'],
             email_data=agent_input
         ),
         background_loop
     )
+    workflow_futures.add(future)
+    future.add_done_callback(functools.partial(_log_result, agent_input['workflow_id']))
     
     print(f"   ✅ Task created - email will process in background")
 
@@ -80,7 +109,21 @@ def start_ui_server():
     """Start FastAPI UI server in background thread."""
     import uvicorn
     print("🌐 Starting HITL Web UI on http://localhost:8000...")
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="warning")
+    
+    # uvloop/httptools ship with uvicorn[standard]; fall back where missing
+    # (e.g. uvloop on Windows). Keep a single worker - pending approvals
+    # live in ui.app module globals - and cap concurrency instead.
+    has_uvloop = importlib.util.find_spec("uvloop") is not None
+    has_httptools = importlib.util.find_spec("httptools") is not None
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        log_level="warning",
+        loop="uvloop" if has_uvloop else "asyncio",
+        http="httptools" if has_httptools else "h11",
+        limit_concurrency=UI_LIMIT_CONCURRENCY
+    )
 
 def open_browser():
     """Open the HITL dashboard in default browser."""
@@ -91,6 +134,12 @@ def main():
     """Main entry point - starts everything."""
     global background_loop
     
+    logging.basicConfig(
+        level=os.getenv("LOGLEVEL", "INFO").upper(),
+        format="[%(asctime)s] %(message)s",
+        datefmt="%H:%M:%S"
+    )
+    
     print("\n" + "="*70)
     print("🚀 EMAIL AGENT - PRODUCTION MODE (CONCURRENT)")
     print("="*70)
@@ -117,9 +166,6 @@ def main():
     
     # 4. Initialize agent in UI app
     print("\n4️⃣  Initializing LangGraph agent...")
-    from src.agents.email_graph import create_email_agent
-    from ui import app as ui_module
-    
     ui_module.agent = create_email_agent()
     ui_module.gmail_service = gmail_service
     ui_module.calendar_service = calendar_service
@@ -142,33 +188,48 @@ def main():
     loop_thread.start()
     
     # Wait for loop to be ready
-    while background_loop is None:
-        time.sleep(0.1)
+    loop_ready.wait()
     
     print("   ✅ Background loop ready")
     print("   ℹ️  Emails will process CONCURRENTLY (no queue blocking)")
-
-    # Share the background loop with the UI app
-    from ui import app as ui_module
-    ui_module.background_loop = background_loop
-    print("   ✅ Background loop shared with UI")
     
     # 7. Start Gmail poller
     print("\n7️⃣  Starting Gmail poller...")
     poller = GmailPoller(gmail_service=gmail_service, poll_interval=60)
     
+    # Prefer push notifications when a Pub/Sub topic is configured
+    push_topic = os.getenv("GMAIL_PUBSUB_TOPIC")
+    push_enabled = False
+    if push_topic:
+        try:
+            poller.watch(push_topic)
+            ui_module.gmail_push_handler = functools.partial(
+                poller.poll_once, process_incoming_email
+            )
+            push_enabled = True
+        except Exception as e:
+            print(f"   ⚠️  Gmail push unavailable, falling back to polling: {e}")
+    
     print("\n" + "="*70)
     print("🎯 EMAIL AGENT IS NOW LIVE!")
     print("="*70)
     print("📧 Monitoring Gmail inbox for new emails")
-    print("🔄 Checking every 60 seconds")
+    if push_enabled:
+        print("📡 Processing emails on Gmail push (POST /gmail/push)")
+    else:
+        print("🔄 Checking every 60 seconds")
     print("🌐 HITL Dashboard: http://localhost:8000")
     print("⚡ Multiple emails will process concurrently")
     print("\nPress Ctrl+C to stop")
     print("="*70 + "\n")
     
     try:
-        poller.start_polling(callback=process_incoming_email)
+        if push_enabled:
+            # Catch up on anything that arrived before the watch started
+            poller.poll_once(process_incoming_email)
+            poller.keep_watch_alive(push_topic)
+        else:
+            poller.start_polling(callback=process_incoming_email)
     except KeyboardInterrupt:
         print("\n\n" + "="*70)
         print("👋 Shutting down gracefully...")
@@ -14,6 +14,9 @@ class AgentMemory:
         self.db_path = db_path
         self.conn = sqlite3.connect(db_path, check_same_thread=False)
         self.conn.row_factory = sqlite3.Row
+        # WAL lets readers (e.g. /stats) proceed while worker threads write
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
         self._create_tables()
     
     def _create_tables(self):
@@ -87,6 +90,24 @@ class AgentMemory:
             )
         """)
         
+        # Interaction counters maintained on insert, so stats never scan
+        # email_history. Seeded from existing history on first creation.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stats_counters (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        cursor.execute("""
+            INSERT OR IGNORE INTO stats_counters (key, value)
+            SELECT 'total_emails', COUNT(*) FROM email_history
+            UNION ALL
+            SELECT 'deny_count', COALESCE(SUM(human_approved = 0 AND action_taken != 'none'), 0)
+            FROM email_history
+            UNION ALL
+            SELECT 'approve_count', COALESCE(SUM(human_approved = 1), 0) FROM email_history
+        """)
+        
         self.conn.commit()
     
     # ===== PREFERENCE MANAGEMENT =====
@@ -216,6 +237,16 @@ class AgentMemory:
             (email_id, email_from, email_subject, triage_decision, action_taken, human_approved)
             VALUES (?, ?, ?, ?, ?, ?)
         """, (email_id, email_from, email_subject, triage_decision, action_taken, human_approved))
+        
+        counters = ['total_emails']
+        if human_approved:
+            counters.append('approve_count')
+        elif action_taken != 'none':
+            counters.append('deny_count')
+        cursor.executemany("""
+            INSERT INTO stats_counters (key, value) VALUES (?, 1)
+            ON CONFLICT(key) DO UPDATE SET value = value + 1
+        """, [(key,) for key in counters])
         self.conn.commit()
     
     def get_sender_history(self, sender_email: str, limit: int = 10) -> List[Dict]:
@@ -458,6 +489,26 @@ class AgentMemory:
         
         return [dict(row) for row in cursor.fetchall()]
     
+    # ===== STATISTICS =====
+    
+    def get_stats(self) -> Dict:
+        """Get summary counts for the dashboard."""
+        cursor = self.conn.cursor()
+        
+        # Interaction counts are precomputed by save_email_interaction
+        cursor.execute("SELECT key, value FROM stats_counters")
+        stats = {row['key']: row['value'] for row in cursor.fetchall()}
+        
+        cursor.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM user_preferences) AS total_preferences,
+                (SELECT COUNT(*) FROM sender_context) AS total_senders,
+                (SELECT COUNT(*) FROM feedback_history) AS total_feedback
+        """)
+        stats.update(dict(cursor.fetchone()))
+        
+        return stats
+    
     # ===== CONTEXT RETRIEVAL =====
     
     def get_full_context(self, sender_email: str) -> Dict:
@@ -1,12 +1,21 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 import asyncio
-import json
+import base64
+import functools
 import uuid
+import orjson
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 import sys 
-from typing import Dict
+import logging
+import logging.handlers
+import queue
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
 from datetime import datetime
 import os
 
@@ -15,53 +24,255 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from dotenv import load_dotenv
 load_dotenv()
 
+from google.auth.transport import requests as google_requests
+from google.oauth2 import id_token
+
 from src.integrations.gmail_auth import authenticate_google_services
 from src.tools.google_tools import initialize_tools
 from src.agents.email_graph import create_email_agent
+from src.nodes.react_agent import react_agent_node
+from src.nodes.execute import execute_action_node
+from src.nodes.memory import get_memory, update_memory_node, initialize_memory
+
+# Workflow logs go through a queue so request handlers never block on stdout
+logger = logging.getLogger("agent.ui")
+
 
+# Worker threads available to agent workflows across all event loops
+MAX_AGENT_THREADS = 8
 
-background_loop = None
+# Worker threads for short SQLite / Gmail calls that must not queue
+# behind long agent runs
+MAX_IO_THREADS = 4
 
-async def _set_event(event):
-    """Helper to set an event from a coroutine."""
-    event.set()
+app = FastAPI(
+    title="Email Agent HITL Interface",
+    default_response_class=ORJSONResponse
+)
 
-app = FastAPI(title="Email Agent HITL Interface")
+# Shared, bounded pool for blocking agent/node calls (instead of the
+# loop's default executor, which grows to min(32, cpu + 4) threads)
+app.state.executor = ThreadPoolExecutor(
+    max_workers=MAX_AGENT_THREADS,
+    thread_name_prefix="agent"
+)
+app.state.io_executor = ThreadPoolExecutor(
+    max_workers=MAX_IO_THREADS,
+    thread_name_prefix="io"
+)
 
 templates = Jinja2Templates(directory="ui/templates")
 
 # Store workflow states and websocket connections
-pending_approvals: Dict[str, dict] = {}
-approval_events: Dict[str, asyncio.Event] = {}
-approval_decisions: Dict[str, dict] = {}
-websocket_connections: list = []
+workflows: Dict[str, "WorkflowSlot"] = {}
+websocket_connections: Dict[int, "Channel"] = {}  # id(websocket) -> Channel
+
+# Frames buffered per client before the oldest are dropped
+CHANNEL_QUEUE_SIZE = 64
+
+
+@dataclass
+class ApprovalData:
+    """Approval request shown to the human; serialized directly by orjson."""
+    __slots__ = (
+        "workflow_id", "action_type", "recipient", "subject",
+        "body", "draft_preview", "timestamp", "notification_type"
+    )
+    
+    workflow_id: str
+    action_type: str
+    recipient: str
+    subject: str
+    body: str
+    draft_preview: str
+    timestamp: str
+    notification_type: bool  # True: notify_human (respond/ignore options)
+
+
+@dataclass
+class WorkflowSlot:
+    """HITL state of one workflow waiting on (or just given) a human decision."""
+    __slots__ = ("approval", "event", "loop", "decision", "created_at")
+    
+    approval: Optional["ApprovalData"]  # Cleared once the human decides
+    event: asyncio.Event
+    loop: asyncio.AbstractEventLoop  # Loop the workflow waits on
+    decision: Optional[dict]
+    created_at: float
+
+
+# Slots older than this are swept (approvals time out after 600 s)
+WORKFLOW_SLOT_TTL = 700
+WORKFLOW_GC_INTERVAL = 60
+
+
+def pending_approvals() -> list:
+    """Approvals still waiting for a human."""
+    return [slot.approval for slot in workflows.values() if slot.approval]
+
+
+# Cleared approval events kept for reuse, per event loop (an Event binds
+# to the loop it is first awaited on)
+EVENT_POOL_SIZE = 256
+_event_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, list]" = weakref.WeakKeyDictionary()
+
+
+def acquire_event() -> asyncio.Event:
+    """Get a cleared Event for the running loop."""
+    pool = _event_pools.get(asyncio.get_running_loop())
+    return pool.pop() if pool else asyncio.Event()
+
+
+def release_event(event: asyncio.Event):
+    """
+    Return an event to the running loop's pool.
+    
+    Safe because decisions only set() an event through record_decision,
+    which ignores slots that have already been finished.
+    """
+    event.clear()
+    pool = _event_pools.setdefault(asyncio.get_running_loop(), [])
+    if len(pool) < EVENT_POOL_SIZE:
+        pool.append(event)
+
+
+def record_decision(workflow_id: str, slot: "WorkflowSlot", decision_data: dict):
+    """
+    Store a human decision and wake the workflow; runs on the slot's loop.
+    
+    A late or duplicate decision (two tabs, a resend) can arrive after
+    the slot was finished and its event recycled, so only act while the
+    slot is still the live one for this workflow.
+    """
+    if workflows.get(workflow_id) is not slot:
+        return
+    slot.decision = decision_data
+    slot.approval = None  # Remove from pending
+    slot.event.set()
+
+
+def finish_slot(workflow_id: str):
+    """Drop a workflow's HITL slot and recycle its event."""
+    slot = workflows.pop(workflow_id, None)
+    if slot is not None:
+        release_event(slot.event)
+
 
 # Initialize agent
 agent = None
 gmail_service = None
 calendar_service = None
 
+# Max blocking agent steps (LLM / Gmail calls) running at once per event loop.
+# Workflows waiting on a human don't hold a slot.
+MAX_CONCURRENT_AGENT_STEPS = 8
+_agent_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+# Wall-clock timestamp for approval/decision envelopes, refreshed once a
+# second by _tick_clock instead of formatted per message
+CURRENT_ISO_TS = datetime.now().isoformat(timespec="seconds")
+
+# Set by run_server when Gmail push notifications are enabled.
+# Called (blocking) to fetch and process new mail on each push.
+gmail_push_handler = None
+_push_future: Optional[asyncio.Future] = None  # Poll started by /gmail/push
+_push_pending = False  # A push arrived while that poll was running
+
+# Reused HTTP session for verifying Pub/Sub push tokens
+_google_request = google_requests.Request()
+
+
+def _start_log_listener() -> logging.handlers.QueueListener:
+    """Route agent.ui logs through a queue drained by a background thread."""
+    log_queue = queue.SimpleQueue()
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(
+        "[%(asctime)s] %(message)s", datefmt="%H:%M:%S"
+    ))
+    
+    logger.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    logger.setLevel(os.getenv("LOGLEVEL", "INFO").upper())
+    logger.propagate = False
+    
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    return listener
+
+
+async def _tick_clock():
+    """Refresh CURRENT_ISO_TS every second."""
+    global CURRENT_ISO_TS
+    while True:
+        CURRENT_ISO_TS = datetime.now().isoformat(timespec="seconds")
+        await asyncio.sleep(1)
+
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup."""
     global agent, gmail_service, calendar_service
     
-    print("\n🚀 Starting Email Agent HITL Server...")
+    app.state.clock_task = asyncio.create_task(_tick_clock())
+    app.state.gc_task = asyncio.create_task(_gc_workflows())
+    app.state.log_listener = _start_log_listener()
+    
+    logger.info("🚀 Starting Email Agent HITL Server...")
     
     try:
         # ✅ Initialize memory system FIRST
-        from src.nodes.memory import initialize_memory
         initialize_memory(db_path="agent_memory.db")
-        print("✅ Memory initialized")
+        logger.info("✅ Memory initialized")
         
         gmail_service, calendar_service = authenticate_google_services()
         initialize_tools(gmail_service, calendar_service)
         agent = create_email_agent()
-        print("✅ Agent initialized successfully")
+        logger.info("✅ Agent initialized successfully")
     except Exception as e:
-        print(f"⚠️  Warning: Could not initialize services: {e}")
-        print("   You can still test the UI manually")
+        logger.warning("⚠️  Could not initialize services: %s (you can still test the UI manually)", e)
+
+
+def _agent_semaphore() -> asyncio.Semaphore:
+    """
+    Semaphore capping concurrent agent steps on the running loop.
+    
+    Keeps a burst of emails from flooding the LLM API. Workflows run on
+    both the UI loop and run_server's background loop, so each loop gets
+    its own semaphore.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _agent_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _agent_semaphores[loop] = asyncio.Semaphore(MAX_CONCURRENT_AGENT_STEPS)
+    return semaphore
+
+
+async def run_agent_step(func, *args):
+    """Run a blocking (sync-only) node call in a worker thread."""
+    async with _agent_semaphore():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(app.state.executor, func, *args)
+
+
+async def run_agent_graph(email_data: dict, config: dict) -> dict:
+    """
+    Run the LangGraph agent in one worker thread.
+    
+    The nodes are sync, so ainvoke would push each node and checkpoint
+    write onto the loop's default executor one hop at a time; a single
+    invoke on app.state.executor keeps the whole run on the bounded pool.
+    """
+    return await run_agent_step(agent.invoke, email_data, config)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks and release the worker threads."""
+    app.state.clock_task.cancel()
+    app.state.gc_task.cancel()
+    app.state.executor.shutdown(wait=False)
+    app.state.io_executor.shutdown(wait=False)
+    app.state.log_listener.stop()
 
 
 @app.get("/")
@@ -70,57 +281,98 @@ async def get_ui(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 
+class Channel:
+    """
+    Outbound side of one websocket client.
+    
+    Broadcasts only enqueue; a relay task owns the socket and drains the
+    queue, so a slow client can't stall everyone else. When the queue is
+    full the oldest frame is dropped.
+    """
+    
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=CHANNEL_QUEUE_SIZE)
+        self.task = asyncio.create_task(self._relay())
+    
+    async def _relay(self):
+        try:
+            while True:
+                frame = await self.queue.get()
+                await self.websocket.send_text(frame)
+        except Exception:
+            # Client went away; stop sending to it
+            websocket_connections.pop(id(self.websocket), None)
+    
+    def _enqueue(self, frame: str):
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.queue.get_nowait()
+            self.queue.put_nowait(frame)
+    
+    def publish(self, frame: str):
+        """Queue a frame; safe to call from any thread or event loop."""
+        try:
+            on_own_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_own_loop = False
+        
+        if on_own_loop:
+            self._enqueue(frame)
+        else:
+            # Workflows may run on run_server's background loop
+            self.loop.call_soon_threadsafe(self._enqueue, frame)
+    
+    def close(self):
+        self.task.cancel()
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket for real-time updates."""
     await websocket.accept()
-    websocket_connections.append(websocket)
+    channel = Channel(websocket)
+    websocket_connections[id(websocket)] = channel
     
     try:
-        # Send any pending approvals to new connection
-        for workflow_id, approval in pending_approvals.items():
-            await websocket.send_json({
-                "type": "approval_request",
-                "data": approval
-            })
+        # Send any pending approvals to new connection in one frame
+        approvals = pending_approvals()
+        if approvals:
+            channel.publish(orjson.dumps({
+                "type": "approval_snapshot",
+                "approvals": approvals
+            }).decode())
         
         # Keep connection alive and listen for decisions
         while True:
             data = await websocket.receive_text()
-            message = json.loads(data)
+            message = orjson.loads(data)
             
             if message["type"] == "human_decision":
                 workflow_id = message["workflow_id"]
                 decision = message["decision"]
                 edited_content = message.get("edited_content", "")
                 
-                print(f"\n👤 Human decision received:")
-                print(f"   Workflow: {workflow_id}")
-                print(f"   Decision: {decision}")
-                
-                # Store the decision
-                approval_decisions[workflow_id] = {
-                    "decision": decision,
-                    "edited_content": edited_content,
-                    "timestamp": datetime.now().isoformat()
-                }
+                logger.info("👤 Human decision received: workflow=%s decision=%s", workflow_id, decision)
                 
-                # Signal the waiting workflow
-                if workflow_id in approval_events:
-                    if background_loop:
-                        # Schedule the set on the background loop
-                        asyncio.run_coroutine_threadsafe(
-                            _set_event(approval_events[workflow_id]),
-                            background_loop
-                        )
-                        print(f"   🔔 Scheduled event set for {workflow_id}")
+                slot = workflows.get(workflow_id)
+                if slot:
+                    decision_data = {
+                        "decision": decision,
+                        "edited_content": edited_content,
+                        "timestamp": CURRENT_ISO_TS
+                    }
+                    
+                    # Signal the waiting workflow on its own loop
+                    if slot.loop is asyncio.get_running_loop():
+                        record_decision(workflow_id, slot, decision_data)
                     else:
-                        # Fallback (should not happen)
-                        approval_events[workflow_id].set()
-                
-                # Remove from pending
-                if workflow_id in pending_approvals:
-                    del pending_approvals[workflow_id]
+                        # Workflow waits on run_server's background loop
+                        slot.loop.call_soon_threadsafe(
+                            record_decision, workflow_id, slot, decision_data
+                        )
                 
                 # Notify all clients
                 await broadcast_message({
@@ -130,24 +382,101 @@ async def websocket_endpoint(websocket: WebSocket):
                 })
     
     except WebSocketDisconnect:
-        websocket_connections.remove(websocket)
+        pass
     except Exception as e:
-        print(f"WebSocket error: {e}")
-        if websocket in websocket_connections:
-            websocket_connections.remove(websocket)
+        logger.warning("WebSocket error: %s", e)
+    finally:
+        channel.close()
+        websocket_connections.pop(id(websocket), None)
 
 
 async def broadcast_message(message: dict):
     """Send message to all connected clients."""
-    disconnected = []
-    for ws in websocket_connections:
+    if not websocket_connections:
+        return
+    
+    # Serialize once; each client's relay task does the actual send
+    frame = orjson.dumps(message).decode()
+    for channel in list(websocket_connections.values()):
+        channel.publish(frame)
+
+
+@app.post("/gmail/push")
+async def gmail_push(request: Request):
+    """
+    Receive Gmail change notifications from Cloud Pub/Sub.
+    
+    The notification only carries the new historyId; the poller fetches
+    the actual messages from Gmail, so a forged push can at most trigger
+    an extra history check. Set GMAIL_PUSH_AUDIENCE to also verify the
+    Pub/Sub OIDC token.
+    """
+    audience = os.getenv("GMAIL_PUSH_AUDIENCE")
+    if audience:
+        auth_header = request.headers.get("Authorization", "")
+        token = auth_header[len("Bearer "):] if auth_header.startswith("Bearer ") else ""
         try:
-            await ws.send_json(message)
-        except Exception:
-            disconnected.append(ws)
+            # Verification fetches Google's certs over HTTPS - keep it off the loop
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                app.state.io_executor,
+                functools.partial(
+                    id_token.verify_oauth2_token, token, _google_request, audience=audience
+                )
+            )
+        except Exception as e:
+            logger.warning("⚠️  Rejected Gmail push: %s", e)
+            return ORJSONResponse({"status": "unauthorized"}, status_code=401)
     
-    for ws in disconnected:
-        websocket_connections.remove(ws)
+    raw_body = await request.body()
+    
+    try:
+        body = orjson.loads(raw_body)
+        notification = orjson.loads(base64.b64decode(body["message"]["data"]))
+    except Exception:
+        # Malformed message - ack it so Pub/Sub doesn't redeliver forever
+        return {"status": "ignored"}
+    
+    logger.info("📡 Gmail push: history %s", notification.get('historyId'))
+    
+    if gmail_push_handler is None:
+        return {"status": "ignored"}
+    
+    _schedule_push_poll()
+    
+    return {"status": "ok"}
+
+
+def _schedule_push_poll():
+    """
+    Run gmail_push_handler, coalescing pushes that arrive mid-poll.
+    
+    A burst of notifications triggers one poll now and at most one more
+    afterwards, instead of a thread per push blocked on the poller lock.
+    """
+    global _push_future, _push_pending
+    
+    if _push_future is not None:
+        _push_pending = True
+        return
+    
+    # Fetching is blocking Gmail I/O - keep it off the event loop
+    loop = asyncio.get_running_loop()
+    _push_future = loop.run_in_executor(app.state.io_executor, gmail_push_handler)
+    _push_future.add_done_callback(_on_push_poll_done)
+
+
+def _on_push_poll_done(future: asyncio.Future):
+    """Log a failed push poll and start the follow-up one if needed."""
+    global _push_future, _push_pending
+    
+    _push_future = None
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("❌ Gmail push poll failed: %s", future.exception())
+    
+    if _push_pending:
+        _push_pending = False
+        _schedule_push_poll()
 
 
 @app.post("/process-email")
@@ -156,7 +485,7 @@ async def process_email(request: Request):
     Process an email through the agent.
     Triggers HITL if needed.
     """
-    body = await request.json()
+    body = orjson.loads(await request.body())
     
     workflow_id = str(uuid.uuid4())[:8]
     
@@ -172,7 +501,7 @@ async def process_email(request: Request):
         "workflow_id": workflow_id
     }
     
-    print(f"\n📧 Processing email: {email_data['email_subject']}")
+    logger.info("📧 Processing email: %s", email_data['email_subject'])
     
     # Notify UI that processing started
     await broadcast_message({
@@ -195,6 +524,34 @@ async def process_email(request: Request):
     }
 
 
+async def save_interaction(memory, **interaction):
+    """Record an email interaction without blocking the event loop."""
+    if memory is None:
+        return
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(
+        app.state.io_executor,
+        functools.partial(memory.save_email_interaction, **interaction)
+    )
+
+
+# Preview shown for notify_human emails
+_NOTIFY_TEMPLATE = "📧 **Notification Email**\n\nFrom: {from}\nSubject: {subject}\n\n{body}"
+NOTIFY_PREVIEW_CHARS = 500
+
+
+def _notification_preview(email_data: dict) -> str:
+    """Build the notify_human preview, truncating only long bodies."""
+    body = email_data["email_body"]
+    if len(body) > NOTIFY_PREVIEW_CHARS:
+        body = body[:NOTIFY_PREVIEW_CHARS] + "..."
+    return _NOTIFY_TEMPLATE.format_map({
+        "from": email_data["email_from"],
+        "subject": email_data["email_subject"],
+        "body": body
+    })
+
+
 async def run_agent_workflow(workflow_id: str, email_data: dict):
     """
     Run the agent workflow asynchronously.
@@ -208,63 +565,66 @@ async def run_agent_workflow(workflow_id: str, email_data: dict):
         }
         
         # Phase 1: Run until HITL checkpoint or triage decision
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None,
-            lambda: agent.invoke(email_data, config)
-        )
+        result = await run_agent_graph(email_data, config)
         
         # Get triage decision
         triage_decision = result.get("triage_decision", "")
         triage_reasoning = result.get("triage_reasoning", "")
         
-        print("\n🔍 DEBUG:")
-        print(f"   triage_decision: {triage_decision}")
-        print(f"   requires_approval: {result.get('requires_approval')}")
+        logger.debug(
+            "triage_decision=%s requires_approval=%s",
+            triage_decision, result.get('requires_approval')
+        )
         
         # Notify triage result
-        await broadcast_message({
-            "type": "triage_complete",
-            "workflow_id": workflow_id,
-            "decision": triage_decision,
-            "reasoning": triage_reasoning
-        })
+        if websocket_connections:
+            await broadcast_message({
+                "type": "triage_complete",
+                "workflow_id": workflow_id,
+                "decision": triage_decision,
+                "reasoning": triage_reasoning
+            })
         
         # ✅ Handle notify_human - show notification with options
         if triage_decision == "notify_human":
-            print(f"\n🔔 NOTIFY_HUMAN: Showing notification with options")
+            logger.info("🔔 NOTIFY_HUMAN: Showing notification with options")
             
             # Create notification approval
-            approval_data = {
-                "workflow_id": workflow_id,
-                "action_type": "notify_human",
-                "recipient": email_data["email_from"],
-                "subject": email_data["email_subject"],
-                "body": email_data["email_body"],
-                "draft_preview": f"📧 **Notification Email**\n\nFrom: {email_data['email_from']}\nSubject: {email_data['email_subject']}\n\n{email_data['email_body'][:500]}...",
-                "timestamp": datetime.now().isoformat(),
-                "notification_type": True  # ✅ Flag for UI to show respond/ignore
-            }
+            approval_data = ApprovalData(
+                workflow_id=workflow_id,
+                action_type="notify_human",
+                recipient=email_data["email_from"],
+                subject=email_data["email_subject"],
+                body=email_data["email_body"],
+                draft_preview=_notification_preview(email_data),
+                timestamp=CURRENT_ISO_TS,
+                notification_type=True  # ✅ Flag for UI to show respond/ignore
+            )
             
             # Store and broadcast
-            pending_approvals[workflow_id] = approval_data
-            approval_events[workflow_id] = asyncio.Event()
+            slot = workflows[workflow_id] = WorkflowSlot(
+                approval=approval_data,
+                event=acquire_event(),
+                loop=asyncio.get_running_loop(),
+                decision=None,
+                created_at=time.monotonic()
+            )
             
             await broadcast_message({
                 "type": "approval_required",
                 "data": approval_data
             })
             
-            print(f"   ⏸️  Waiting for human decision (respond or ignore)")
+            logger.info("⏸️  Waiting for human decision (respond or ignore)")
             
             # Wait for human decision
             try:
                 await asyncio.wait_for(
-                    approval_events[workflow_id].wait(),
+                    slot.event.wait(),
                     timeout=600
                 )
             except asyncio.TimeoutError:
-                print(f"   ⏰ Timed out")
+                logger.info("⏰ Workflow %s timed out", workflow_id)
                 await broadcast_message({
                     "type": "workflow_timeout",
                     "workflow_id": workflow_id
@@ -272,16 +632,28 @@ async def run_agent_workflow(workflow_id: str, email_data: dict):
                 return
             
             # Get decision
-            decision_data = approval_decisions.get(workflow_id, {})
+            decision_data = slot.decision or {}
+            finish_slot(workflow_id)
             decision = decision_data.get("decision", "ignore")
             
-            print(f"\n   👤 Human chose: {decision}")
+            logger.info("👤 Human chose: %s", decision)
             
             if decision == "ignore":
                 # Update memory: Save that this type of email should be ignored
-                print(f"   💾 Updating memory: User ignored this notification")
+                logger.info("💾 Updating memory: User ignored this notification")
+                
+                # ✅ Save to memory that email was denied/ignored
+                await save_interaction(
+                    get_memory(),
+                    email_id=workflow_id,
+                    email_from=email_data["email_from"],
+                    email_subject=email_data["email_subject"],
+                    triage_decision="notify_human",
+                    action_taken="none",
+                    human_approved=False  # ✅ This is the deny!
+                )
                 
-                # Notify completion
+                # Notify completion only once the write succeeded
                 await broadcast_message({
                     "type": "workflow_complete",
                     "workflow_id": workflow_id,
@@ -289,62 +661,41 @@ async def run_agent_workflow(workflow_id: str, email_data: dict):
                     "execution_status": "complete"
                 })
                 
-                # ✅ Save to memory that email was denied/ignored
-                from src.nodes.memory import get_memory
-                memory = get_memory()
-                if memory:
-                    memory.save_email_interaction(
-                        email_id=workflow_id,
-                        email_from=email_data["email_from"],
-                        email_subject=email_data["email_subject"],
-                        triage_decision="notify_human",
-                        action_taken="none",
-                        human_approved=False  # ✅ This is the deny!
-                    )
-                
                 return
             
             elif decision == "respond":
-                print(f"   ▶️  User wants to respond - creating draft...")
+                logger.info("▶️  User wants to respond - creating draft...")
                 
                 # ✅ FIX: Instead of re-invoking the whole workflow,
                 # manually call the react_agent node
-                from src.nodes.react_agent import react_agent_node
                 
-                # Update state to indicate we're responding
-                email_data_for_draft = {
-                    **result,  # Keep existing state
+                # Update state (in place) to indicate we're responding
+                result.update({
                     "triage_decision": "respond",
                     "email_id": email_data["email_id"],
                     "email_from": email_data["email_from"],
                     "email_to": email_data.get("email_to", "you@company.com"),
                     "email_subject": email_data["email_subject"],
                     "email_body": email_data["email_body"],
-                }
+                })
                 
                 try:
-                    print(f"   🤖 Calling react_agent to generate draft...")
+                    logger.debug("Calling react_agent to generate draft...")
                     
                     # Call react_agent directly in executor
-                    draft_result = await loop.run_in_executor(
-                        None,
-                        lambda: react_agent_node(email_data_for_draft)
-                    )
+                    draft_result = await run_agent_step(react_agent_node, result)
                     
-                    print(f"   ✅ Draft created")
-                    print(f"   Draft has pending_action: {draft_result.get('pending_action') is not None}")
+                    logger.info(
+                        "✅ Draft created (pending_action: %s)",
+                        draft_result.get('pending_action') is not None
+                    )
                     
                     # Update result with draft
-                    result = {
-                        **result,
-                        **draft_result,
-                        "requires_approval": True  # Force approval
-                    }
+                    result.update(draft_result)
+                    result["requires_approval"] = True  # Force approval
                     
                 except Exception as e:
-                    print(f"   ❌ Error creating draft: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.exception("❌ Error creating draft: %s", e)
                     
                     await broadcast_message({
                         "type": "workflow_error",
@@ -368,36 +719,41 @@ async def run_agent_workflow(workflow_id: str, email_data: dict):
                 else:
                     draft_preview = str(msg)
             
-            approval_data = {
-                "workflow_id": workflow_id,
-                "action_type": pending_action.get("action_type", ""),
-                "recipient": args.get("recipient", ""),
-                "subject": args.get("subject", ""),
-                "body": args.get("body", ""),
-                "draft_preview": draft_preview,
-                "timestamp": datetime.now().isoformat(),
-                "notification_type": False  # ✅ Regular approval
-            }
+            approval_data = ApprovalData(
+                workflow_id=workflow_id,
+                action_type=pending_action.get("action_type", ""),
+                recipient=args.get("recipient", ""),
+                subject=args.get("subject", ""),
+                body=args.get("body", ""),
+                draft_preview=draft_preview,
+                timestamp=CURRENT_ISO_TS,
+                notification_type=False  # ✅ Regular approval
+            )
             
             # Store and broadcast
-            pending_approvals[workflow_id] = approval_data
-            approval_events[workflow_id] = asyncio.Event()
+            slot = workflows[workflow_id] = WorkflowSlot(
+                approval=approval_data,
+                event=acquire_event(),
+                loop=asyncio.get_running_loop(),
+                decision=None,
+                created_at=time.monotonic()
+            )
             
             await broadcast_message({
                 "type": "approval_required",
                 "data": approval_data
             })
             
-            print(f"\n⏸️  Workflow {workflow_id} paused for approval")
+            logger.info("⏸️  Workflow %s paused for approval", workflow_id)
             
             # Wait for human decision
             try:
                 await asyncio.wait_for(
-                    approval_events[workflow_id].wait(),
+                    slot.event.wait(),
                     timeout=600
                 )
             except asyncio.TimeoutError:
-                print(f"⏰ Workflow {workflow_id} timed out")
+                logger.info("⏰ Workflow %s timed out", workflow_id)
                 await broadcast_message({
                     "type": "workflow_timeout",
                     "workflow_id": workflow_id
@@ -405,31 +761,26 @@ async def run_agent_workflow(workflow_id: str, email_data: dict):
                 return
             
             # Get decision
-            decision_data = approval_decisions.get(workflow_id, {})
+            decision_data = slot.decision or {}
+            finish_slot(workflow_id)
             decision = decision_data.get("decision", "deny")
             edited_content = decision_data.get("edited_content", "")
             
-            print(f"\n▶️  Resuming workflow {workflow_id}")
-            print(f"   Decision: {decision}")
-            print(f"   🔍 DEBUG: About to check decision type...")
-            sys.stdout.flush()
+            logger.info("▶️  Resuming workflow %s (decision: %s)", workflow_id, decision)
             
             # ✅ Handle deny - save to memory
             if decision == "deny":
-                print(f"   🚫 User denied - saving to memory")
-                sys.stdout.flush()
+                logger.info("🚫 User denied - saving to memory")
                 
-                from src.nodes.memory import get_memory
-                memory = get_memory()
-                if memory:
-                    memory.save_email_interaction(
-                        email_id=workflow_id,
-                        email_from=email_data["email_from"],
-                        email_subject=email_data["email_subject"],
-                        triage_decision=result.get("triage_decision", "respond"),
-                        action_taken="none",
-                        human_approved=False  # ✅ Denied!
-                    )
+                await save_interaction(
+                    get_memory(),
+                    email_id=workflow_id,
+                    email_from=email_data["email_from"],
+                    email_subject=email_data["email_subject"],
+                    triage_decision=result.get("triage_decision", "respond"),
+                    action_taken="none",
+                    human_approved=False  # ✅ Denied!
+                )
                 
                 await broadcast_message({
                     "type": "workflow_complete",
@@ -439,68 +790,43 @@ async def run_agent_workflow(workflow_id: str, email_data: dict):
                 })
                 return
             
-            print(f"   🔍 DEBUG: Passed deny check, continuing...")
-            sys.stdout.flush()
             
             # ✅ FIX: Instead of re-invoking the graph, manually execute and update memory
             
             # Update state with decision
-            updated_state = {
-                **result,
-                "human_decision": decision
-            }
+            result["human_decision"] = decision
             
-            print(f"   🔍 DEBUG: Updated state created")
-            sys.stdout.flush()
             
             if decision == "edit" and edited_content:
-                print(f"   ✏️  User edited - using edited content")
-                sys.stdout.flush()
-                updated_state["human_feedback"] = {
+                logger.info("✏️  User edited - using edited content")
+                result["human_feedback"] = {
                     "body_content": edited_content
                 }
-                updated_state["human_decision"] = "edit"
+                result["human_decision"] = "edit"
                 
                 # Update the pending_action with edited content
-                if updated_state.get("pending_action"):
-                    updated_state["pending_action"]["args"]["body"] = edited_content
+                if result.get("pending_action"):
+                    result["pending_action"]["args"]["body"] = edited_content
             
-            print(f"   ⚙️  Executing action...")
-            sys.stdout.flush()
+            logger.info("⚙️  Executing action...")
             
             # Manually call execute_action_node and update_memory_node
-            from src.nodes.execute import execute_action_node
-            from src.nodes.memory import update_memory_node
-            
-            print(f"   🔍 DEBUG: Imported nodes, about to execute...")
-            sys.stdout.flush()
-            
             try:
                 # Execute the action
-                print(f"   🔍 DEBUG: Calling execute_action_node...")
-                sys.stdout.flush()
+                logger.debug("Calling execute_action_node...")
                 
-                execution_result = await loop.run_in_executor(
-                    None,
-                    lambda: execute_action_node(updated_state)
-                )
+                execution_result = await run_agent_step(execute_action_node, result)
                 
-                print(f"   ✅ Action executed: {execution_result.get('execution_status')}")
-                sys.stdout.flush()
+                logger.info("✅ Action executed: %s", execution_result.get('execution_status'))
                 
                 # Update memory
-                print(f"   🔍 DEBUG: Calling update_memory_node...")
-                sys.stdout.flush()
+                logger.debug("Calling update_memory_node...")
                 
-                memory_result = await loop.run_in_executor(
-                    None,
-                    lambda: update_memory_node(execution_result)
-                )
+                await run_agent_step(update_memory_node, execution_result)
                 
-                print(f"   💾 Memory updated")
-                sys.stdout.flush()
+                logger.info("💾 Memory updated")
                 
-                # Notify completion
+                # Notify completion only once the write succeeded
                 await broadcast_message({
                     "type": "workflow_complete",
                     "workflow_id": workflow_id,
@@ -510,9 +836,7 @@ async def run_agent_workflow(workflow_id: str, email_data: dict):
                 })
                 
             except Exception as e:
-                print(f"   ❌ Error executing/updating: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("❌ Error executing/updating: %s", e)
                 
                 await broadcast_message({
                     "type": "workflow_error",
@@ -522,31 +846,59 @@ async def run_agent_workflow(workflow_id: str, email_data: dict):
             
         else:
             # No approval needed (auto-processed)
-            await broadcast_message({
-                "type": "workflow_complete",
-                "workflow_id": workflow_id,
-                "decision": "auto_approved",
-                "execution_status": "complete"
-            })
+            if websocket_connections:
+                await broadcast_message({
+                    "type": "workflow_complete",
+                    "workflow_id": workflow_id,
+                    "decision": "auto_approved",
+                    "execution_status": "complete"
+                })
     
     except Exception as e:
-        print(f"❌ Workflow error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Workflow error: %s", e)
         
         await broadcast_message({
             "type": "workflow_error",
             "workflow_id": workflow_id,
             "error": str(e)
         })
+    
+    finally:
+        # Never leave HITL state behind, whatever path we exit by
+        finish_slot(workflow_id)
+
+
+async def _gc_workflows():
+    """Periodically evict workflow slots that outlived the approval timeout."""
+    while True:
+        await asyncio.sleep(WORKFLOW_GC_INTERVAL)
+        cutoff = time.monotonic() - WORKFLOW_SLOT_TTL
+        for workflow_id, slot in list(workflows.items()):
+            if slot.created_at >= cutoff:
+                continue
+            # Tear down on the slot's own loop, like every other path
+            if slot.loop is asyncio.get_running_loop():
+                expire_slot(workflow_id, slot)
+            else:
+                slot.loop.call_soon_threadsafe(expire_slot, workflow_id, slot)
+
+
+def expire_slot(workflow_id: str, slot: "WorkflowSlot"):
+    """Finish a slot the sweeper found expired; runs on the slot's loop."""
+    if workflows.get(workflow_id) is not slot:
+        return
+    # Wake anything still waiting before its event is recycled
+    slot.event.set()
+    finish_slot(workflow_id)
 
 
 @app.get("/pending-approvals")
 async def get_pending_approvals():
     """Get all pending approvals."""
+    approvals = pending_approvals()
     return {
-        "count": len(pending_approvals),
-        "approvals": list(pending_approvals.values())
+        "count": len(approvals),
+        "approvals": approvals
     }
 
 
@@ -558,41 +910,34 @@ async def health_check():
         "agent_ready": agent is not None,
         "gmail_connected": gmail_service is not None,
         "calendar_connected": calendar_service is not None,
-        "pending_approvals": len(pending_approvals),
+        "pending_approvals": len(pending_approvals()),
         "connected_clients": len(websocket_connections)
     }
 
 
+# Seconds a /stats snapshot is reused
+STATS_CACHE_TTL = 5.0
+_stats_cache = None  # (monotonic time, stats dict)
+
+
 @app.get("/stats")
 async def get_stats():
     """Get memory statistics including deny counts."""
-    from src.nodes.memory import get_memory
-    
     memory = get_memory()
     if not memory:
         return {"error": "Memory not initialized"}
     
-    stats = memory.get_stats()
-    
-    # ✅ Calculate deny count
-    cursor = memory.conn.execute("""
-        SELECT COUNT(*) 
-        FROM email_history 
-        WHERE human_approved = 0 AND action_taken != 'none'
-    """)
-    deny_count = cursor.fetchone()[0]
+    global _stats_cache
     
-    # Calculate approve count
-    cursor = memory.conn.execute("""
-        SELECT COUNT(*) 
-        FROM email_history 
-        WHERE human_approved = 1
-    """)
-    approve_count = cursor.fetchone()[0]
+    # Dashboards poll this; serve a recent snapshot instead of hitting SQLite
+    now = time.monotonic()
+    if _stats_cache is None or now - _stats_cache[0] > STATS_CACHE_TTL:
+        # Keep SQLite I/O off the event loop
+        loop = asyncio.get_running_loop()
+        _stats_cache = (now, await loop.run_in_executor(app.state.io_executor, memory.get_stats))
+    stats = _stats_cache[1]
     
     return {
         **stats,
-        "deny_count": deny_count,
-        "approve_count": approve_count,
-        "pending_count": len(pending_approvals)
+        "pending_count": len(pending_approvals())
     }
\ No newline at end of file